@@ -10,7 +10,6 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WBChat.settings')
@@ -21,6 +20,7 @@ django_asgi_app = get_asgi_application()
 
 # Import routing after Django setup
 from chat import routing as chat_routing
+from chat.middleware import JWTAuthMiddleware
 
 application = ProtocolTypeRouter({
     # Django's ASGI application to handle traditional HTTP requests
@@ -28,7 +28,7 @@ application = ProtocolTypeRouter({
 
     # WebSocket chat handler
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        JWTAuthMiddleware(
             URLRouter(
                 chat_routing.websocket_urlpatterns
             )
@@ -105,6 +105,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2 first: new and re-saved passwords use it, while existing PBKDF2
+# hashes still verify and are upgraded on the next successful login
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -126,6 +136,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/avatars/'
 MEDIA_ROOT = BASE_DIR / 'avatars'
 
+# Largest avatar accepted at registration (bytes)
+MAX_AVATAR_SIZE = 5 * 1024 * 1024
+
 
 
 # Static files (CSS, JavaScript, Images)
@@ -138,6 +151,32 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ==============================================================================
+# CACHE CONFIGURATION
+# ==============================================================================
+
+# Local-memory cache for development (will switch to Redis in production)
+# Presence flushing, the cached membership check and cached_db sessions all
+# need a cache shared by every process; `check --deploy` warns (chat.W001)
+# while this is process-local
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# To use Redis (uncomment when Redis is running):
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379/1',
+#     }
+# }
+
+# Serve sessions from the cache and fall back to the database on a miss,
+# so the WebSocket auth middleware rarely touches Postgres
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # ==============================================================================
 # CHANNELS & REDIS CONFIGURATION
 # ==============================================================================
@@ -172,6 +211,13 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Persist cached presence activity (see chat.tasks.flush_presence)
+    'flush-presence': {
+        'task': 'chat.tasks.flush_presence',
+        'schedule': 60.0,
+    },
+}
 
 # ==============================================================================
 # REST FRAMEWORK CONFIGURATION
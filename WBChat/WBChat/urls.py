@@ -3,7 +3,7 @@ from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
 from accounts.views import register, login_view, profile_view, logout_view, profile_edit, home
-from news.views import news_detail, news_list, edit_news, delete_news, create_news
+from news.views import news_detail, news_list, edit_news, delete_news, create_news, import_news
 
 urlpatterns = [
     path('', home, name='home'),
@@ -18,6 +18,7 @@ urlpatterns = [
     path('news/<int:pk>/edit/', edit_news, name='news_edit'),
     path('news/<int:pk>/delete/', delete_news, name='news_delete'),
     path('news/create/', create_news, name='create_news'),
+    path('news/import/', import_news, name='import_news'),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
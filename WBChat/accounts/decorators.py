@@ -0,0 +1,16 @@
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden
+
+
+def moderator_required(view):
+    """login_required и ответ 403 для пользователей без прав модератора"""
+    @wraps(view)
+    @login_required(login_url='login')
+    def _wrapped(request, *args, **kwargs):
+        # login_required уже отсеял анонимов, is_authenticated повторно не проверяем
+        if not request.user.isModerator:
+            return HttpResponseForbidden("У вас нет прав.")
+        return view(request, *args, **kwargs)
+    return _wrapped
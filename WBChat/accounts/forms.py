@@ -36,12 +36,13 @@ class ProfileEditForm(forms.ModelForm):
         if old or new or confirm:
             if not old:
                 raise forms.ValidationError("Введите старый пароль.")
-            if not self.user.check_password(old):
-                raise forms.ValidationError("Старый пароль неверный.")
             if not new:
                 raise forms.ValidationError("Введите новый пароль.")
             if new != confirm:
                 raise forms.ValidationError("Новые пароли не совпадают.")
+            # Хеширование дорогое — проверяем старый пароль последним
+            if not self.user.check_password(old):
+                raise forms.ValidationError("Старый пароль неверный.")
 
         return cleaned
 
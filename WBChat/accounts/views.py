@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib import messages
 from django.shortcuts import render, redirect
@@ -10,6 +11,14 @@ def home(request):
     return redirect('login')
 def register(request):
     if request.method == 'POST':
+        # Отсекаем слишком большой аватар до того, как Pillow начнёт его разбирать
+        avatar = request.FILES.get('avatar')
+        if avatar and avatar.size > settings.MAX_AVATAR_SIZE:
+            form = RegisterForm(request.POST)
+            form.is_valid()
+            form.add_error('avatar', "Файл аватара слишком большой.")
+            return render(request, 'accounts/register.html', {'form': form})
+
         form = RegisterForm(request.POST, request.FILES)
         if form.is_valid():
             user = form.save()
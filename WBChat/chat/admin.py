@@ -7,36 +7,60 @@ from .models import (
     Attachment,
     Reaction,
     TypingIndicator,
-    OnlineStatus
+    OnlineStatus,
+    participants_prefetch
 )
 
 
+class ConversationParticipantsMixin:
+    """
+    Prefetch participants of each row's conversation in one query, so the
+    conversation column (``Conversation.__str__``) doesn't query per row.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            participants_prefetch('conversation__participants')
+        )
+
+
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ['id', 'type', 'name', 'created_by', 'created_at', 'is_active']
     list_filter = ['type', 'is_active', 'is_archived', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['created_by']
+
+    def get_queryset(self, request):
+        # __str__ of direct conversations lists participants; fetch them in one query
+        return super().get_queryset(request).with_participants()
 
 
 @admin.register(UserConversation)
-class UserConversationAdmin(admin.ModelAdmin):
+class UserConversationAdmin(ConversationParticipantsMixin, admin.ModelAdmin):
     list_display = ['user', 'conversation', 'role', 'is_pinned', 'is_muted', 'joined_at']
     list_filter = ['role', 'is_pinned', 'is_muted', 'joined_at']
     search_fields = ['user__username', 'conversation__name']
     readonly_fields = ['joined_at']
+    list_select_related = ['user', 'conversation']
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ConversationParticipantsMixin, admin.ModelAdmin):
     list_display = ['id', 'author', 'conversation', 'type', 'content_preview', 'created_at', 'is_deleted']
     list_filter = ['type', 'is_deleted', 'is_pinned', 'created_at']
     search_fields = ['content', 'author__username']
     readonly_fields = ['created_at', 'updated_at', 'edited_at', 'deleted_at']
     raw_id_fields = ['conversation', 'author', 'reply_to', 'forwarded_from']
+    list_select_related = ['author', 'conversation']
+
+    def get_queryset(self, request):
+        # The changelist only shows the stored preview, not the full TEXT
+        return super().get_queryset(request).defer('content')
 
     def content_preview(self, obj):
-        return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
+        return obj.preview[:50] + '...' if len(obj.preview) > 50 else obj.preview
     content_preview.short_description = 'Content'
 
 
@@ -47,6 +71,7 @@ class MessageStatusAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'message__content']
     readonly_fields = ['sent_at', 'delivered_at', 'read_at']
     raw_id_fields = ['message', 'user']
+    list_select_related = ['message__author', 'user']
 
 
 @admin.register(Attachment)
@@ -56,6 +81,7 @@ class AttachmentAdmin(admin.ModelAdmin):
     search_fields = ['file_name', 'uploaded_by__username']
     readonly_fields = ['uploaded_at']
     raw_id_fields = ['message', 'uploaded_by']
+    list_select_related = ['uploaded_by']
 
 
 @admin.register(Reaction)
@@ -65,15 +91,17 @@ class ReactionAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'emoji']
     readonly_fields = ['created_at']
     raw_id_fields = ['message', 'user']
+    list_select_related = ['message__author', 'user']
 
 
 @admin.register(TypingIndicator)
-class TypingIndicatorAdmin(admin.ModelAdmin):
+class TypingIndicatorAdmin(ConversationParticipantsMixin, admin.ModelAdmin):
     list_display = ['user', 'conversation', 'started_at']
     list_filter = ['started_at']
     search_fields = ['user__username', 'conversation__name']
     readonly_fields = ['started_at']
     raw_id_fields = ['conversation', 'user']
+    list_select_related = ['user', 'conversation']
 
 
 @admin.register(OnlineStatus)
@@ -82,4 +110,5 @@ class OnlineStatusAdmin(admin.ModelAdmin):
     list_filter = ['is_online', 'show_online_status', 'show_last_seen']
     search_fields = ['user__username']
     readonly_fields = ['last_activity_at', 'last_seen_at']
+    list_select_related = ['user']
     raw_id_fields = ['current_conversation']
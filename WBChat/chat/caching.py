@@ -0,0 +1,39 @@
+"""
+Cache keys and timeouts shared by the chat consumers and signal handlers.
+"""
+from django.core.cache import cache
+
+# How long a conversation-membership check stays cached (seconds)
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+
+def membership_key(user_id, conversation_id):
+    """Cache key for "is this user an active member of this conversation"."""
+    return f'memb:{user_id}:{conversation_id}'
+
+
+# Typing indicators expire on their own after this many seconds
+TYPING_TIMEOUT = 5
+
+
+def typing_key(conversation_id, user_id):
+    """Cache key marking a user as typing in a conversation."""
+    return f'typing:{conversation_id}:{user_id}'
+
+
+def typing_user_ids(conversation_id, user_ids):
+    """
+    Which of ``user_ids`` are typing in a conversation, in one ``get_many``.
+    Django's cache API can't scan by prefix, so callers pass the member ids.
+    """
+    keys = {typing_key(conversation_id, user_id): user_id for user_id in user_ids}
+    return [keys[key] for key in cache.get_many(keys)]
+
+
+# Cached activity outlives several presence flushes before it expires (seconds)
+PRESENCE_TIMEOUT = 300
+
+
+def presence_key(user_id):
+    """Cache key holding a user's (last_activity_at, current_conversation_id)."""
+    return f'presence:last:{user_id}'
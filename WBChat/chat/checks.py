@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+CACHED_SESSION_ENGINES = {
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Chat state cached in one process has to be visible to (and invalidated in) every other"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    affected = [
+        "chat.tasks.flush_presence in the Celery worker never sees the "
+        "activity cached by the WebSocket consumers",
+        "a UserConversation change saved in one process leaves the cached "
+        "membership check stale in the others, so a removed member can "
+        "still connect until it expires",
+    ]
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        affected.append(
+            "a logout or session flush in one process leaves the session "
+            "readable from another process's cache"
+        )
+    return [Warning(
+        "The default cache is process-local: " + "; ".join(affected) + ".",
+        hint="Use a shared cache such as RedisCache in production.",
+        id='chat.W001',
+    )]
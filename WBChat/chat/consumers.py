@@ -1,31 +1,111 @@
-import json
+import asyncio
+import time
+
+import orjson
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.utils import timezone
+from channels.layers import InMemoryChannelLayer
+from django.db import connection, transaction
+from django.db.models.functions import Now
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from .caching import (
+    MEMBERSHIP_CACHE_TIMEOUT,
+    PRESENCE_TIMEOUT,
+    TYPING_TIMEOUT,
+    membership_key,
+    presence_key,
+    typing_key,
+    typing_user_ids,
+)
 from .models import (
     Conversation,
     Message,
     MessageStatus,
-    TypingIndicator,
     OnlineStatus,
+    Reaction,
     UserConversation,
 )
 
+try:
+    from channels_redis.core import RedisChannelLayer
+except ImportError:
+    RedisChannelLayer = None
+
+# Private RedisChannelLayer attributes group_size() relies on
+REDIS_LAYER_INTERNALS = ('connection', 'consistent_hash', '_group_key', 'group_expiry')
+
 User = get_user_model()
 
 
+def dump_json(data):
+    """Encode an outgoing WebSocket frame with orjson"""
+    return orjson.dumps(data).decode()
+
+
+async def group_size(channel_layer, group):
+    """
+    Number of channels in a room group as the channel layer itself tracks it,
+    or None when the layer gives no way to ask. The layer is what group_send
+    fans out to, so this can't drift from the real membership.
+    """
+    if isinstance(channel_layer, InMemoryChannelLayer):
+        return len(channel_layer.groups.get(group, ()))
+    if RedisChannelLayer is not None and isinstance(channel_layer, RedisChannelLayer):
+        # Mirrors RedisChannelLayer.group_send as of channels_redis 4.2.1 (a
+        # sorted set scored by join time; entries older than group_expiry are
+        # ignored). These are private, so give up if a release renames them
+        if not all(hasattr(channel_layer, name) for name in REDIS_LAYER_INTERNALS):
+            return None
+        redis = channel_layer.connection(channel_layer.consistent_hash(group))
+        return await redis.zcount(
+            channel_layer._group_key(group),
+            int(time.time()) - channel_layer.group_expiry,
+            '+inf'
+        )
+    # Other layers (e.g. Redis pub/sub) only know their own process's groups
+    return None
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time chat messaging.
     Handles: sending/receiving messages, typing indicators, read receipts
     """
 
+    # Read receipts are buffered this long (seconds) and flushed as one batch
+    READ_RECEIPT_DELAY = 0.25
+
+    # Activity is cached at most this often per socket (seconds)
+    ACTIVITY_WRITE_INTERVAL = 30
+
+    # Once other sockets are seen in the room, skip re-counting them for this
+    # long (seconds); a busy room then costs no lookup per typing frame
+    SUBSCRIBER_CHECK_INTERVAL = 5
+
+    # Incoming frame type -> handler method
+    HANDLERS = {
+        'chat_message': 'handle_chat_message',
+        'typing': 'handle_typing',
+        'read_receipt': 'handle_read_receipt',
+        'edit_message': 'handle_edit_message',
+        'delete_message': 'handle_delete_message',
+        'reaction': 'handle_reaction',
+    }
+
     async def connect(self):
         """Handle WebSocket connection"""
         self.user = self.scope['user']
         self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
         self.room_group_name = f'chat_{self.conversation_id}'
+        self._online_task = None
+        self._online = False
+        self._activity_written_at = None
+        self._others_seen_at = None
+        self._read_buffer = set()
+        self._read_task = None
+        self._subscribed = False
 
         # Reject anonymous users
         if not self.user.is_authenticated:
@@ -43,69 +123,112 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        self._subscribed = True
 
-        await self.accept()
+        await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
 
-        # Update user's online status
-        await self.update_online_status(online=True)
+        # Update user's online status without holding up the handshake
+        self._online_task = asyncio.create_task(self.go_online())
+
+        # Show who is already typing; a solo room has nobody to list
+        if await self.has_other_subscribers():
+            typers = await self.get_typing_users()
+            if typers:
+                await self.send(text_data=dump_json({
+                    'type': 'typing_snapshot',
+                    'users': typers,
+                }))
 
         # Notify others that user joined
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_join',
-                'user_id': self.user.id,
-                'username': self.user.username,
-            }
-        )
+        await self.broadcast({
+            'type': 'user_join',
+            'user_id': self.user.id,
+            'username': self.user.username,
+        }, skip_self=True)
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
+        # Flush read receipts that are still waiting in the buffer
+        if self._read_task:
+            self._read_task.cancel()
+            self._read_task = None
+        try:
+            await self.flush_read_receipts()
+        finally:
+            # Room and presence cleanup must run even if the flush failed
+            await self.leave_conversation()
+
+    async def go_online(self):
+        await self.update_online_status(online=True)
+        # Only a socket whose upsert landed may decrement connection_count
+        self._online = True
+        # The upsert wrote fresher activity than any entry still cached
+        await cache.adelete(presence_key(self.user.id))
+
+    async def leave_conversation(self):
+        """Undo everything connect() registered for this socket"""
+        # Rejected in connect(): nothing was registered, and the user's
+        # other tabs must keep their connection_count
+        if not self._subscribed:
+            return
+
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-        # Update user's online status
-        await self.update_online_status(online=False)
+        # Update user's online status, after the connect-time update lands
+        if self._online_task:
+            await asyncio.wait([self._online_task])
+        if self._online:
+            await self.update_online_status(online=False)
+            await cache.adelete(presence_key(self.user.id))
 
         # Clear typing indicator
         await self.clear_typing_indicator()
 
         # Notify others that user left
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_leave',
-                'user_id': self.user.id,
-                'username': self.user.username,
-            }
-        )
+        await self.broadcast({
+            'type': 'user_leave',
+            'user_id': self.user.id,
+            'username': self.user.username,
+        }, skip_self=True)
 
     async def receive(self, text_data):
         """Receive message from WebSocket"""
         try:
-            data = json.loads(text_data)
-            message_type = data.get('type')
-
-            if message_type == 'chat_message':
-                await self.handle_chat_message(data)
-            elif message_type == 'typing':
-                await self.handle_typing(data)
-            elif message_type == 'read_receipt':
-                await self.handle_read_receipt(data)
-            elif message_type == 'edit_message':
-                await self.handle_edit_message(data)
-            elif message_type == 'delete_message':
-                await self.handle_delete_message(data)
-            elif message_type == 'reaction':
-                await self.handle_reaction(data)
-
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
+            data = orjson.loads(text_data)
+        except orjson.JSONDecodeError:
+            await self.send(text_data=dump_json({
                 'error': 'Invalid JSON'
             }))
+            return
+
+        if not isinstance(data, dict):
+            await self.send(text_data=dump_json({
+                'error': 'Invalid message'
+            }))
+            return
+
+        message_type = data.get('type')
+        handler_name = self.HANDLERS.get(message_type) if isinstance(message_type, str) else None
+        if handler_name:
+            await getattr(self, handler_name)(data)
+            await self.touch_activity()
+
+    async def touch_activity(self):
+        """Cache this socket's activity for flush_presence, throttled per socket"""
+        now = time.monotonic()
+        if (self._activity_written_at is not None
+                and now - self._activity_written_at < self.ACTIVITY_WRITE_INTERVAL):
+            return
+        self._activity_written_at = now
+        await cache.aset(
+            presence_key(self.user.id),
+            (timezone.now(), int(self.conversation_id)),
+            PRESENCE_TIMEOUT
+        )
 
     async def handle_chat_message(self, data):
         """Handle incoming chat message"""
@@ -115,20 +238,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if not content.strip():
             return
 
-        # Save message to database
+        # Save message and participant statuses in one transaction
         message = await self.create_message(content, reply_to_id)
 
-        # Send message to room group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': await self.message_to_dict(message),
-            }
-        )
-
-        # Create message statuses for all participants
-        await self.create_message_statuses(message)
+        # Send message to room group once the transaction has committed
+        await self.broadcast({
+            'type': 'chat_message',
+            'message': self.message_to_dict(message),
+        })
 
     async def handle_typing(self, data):
         """Handle typing indicator"""
@@ -139,31 +256,58 @@ class ChatConsumer(AsyncWebsocketConsumer):
         else:
             await self.clear_typing_indicator()
 
-        # Broadcast typing status to room
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'typing_indicator',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'is_typing': is_typing,
-            }
-        )
+        # Nobody else is listening, so there is nobody to tell
+        if not await self.has_other_subscribers():
+            return
+
+        # Broadcast typing status to room (own indicator is not sent back)
+        await self.broadcast({
+            'type': 'typing',
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'is_typing': is_typing,
+        }, skip_self=True)
 
     async def handle_read_receipt(self, data):
         """Handle read receipt for messages"""
-        message_ids = data.get('message_ids', [])
+        message_ids = data.get('message_ids')
+        if not isinstance(message_ids, list):
+            return
+
+        # Scrolling sends many small batches; collect them and write once.
+        # Ids are normalised to int so the buffer always sorts; junk is dropped.
+        for message_id in message_ids:
+            try:
+                self._read_buffer.add(int(message_id))
+            except (TypeError, ValueError):
+                continue
+        if self._read_task is None:
+            self._read_task = asyncio.create_task(self._delayed_read_flush())
+
+    async def _delayed_read_flush(self):
+        await asyncio.sleep(self.READ_RECEIPT_DELAY)
+        self._read_task = None
+        await self.flush_read_receipts()
+
+    async def flush_read_receipts(self):
+        """Persist and broadcast buffered read receipts"""
+        if not self._read_buffer:
+            return
+        # Swap the buffer out first so a failed write can't wedge later flushes
+        buffered, self._read_buffer = self._read_buffer, set()
+        message_ids = sorted(buffered)
+
         await self.mark_messages_as_read(message_ids)
 
+        if not await self.has_other_subscribers():
+            return
+
         # Notify others about read receipts
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'read_receipt',
-                'user_id': self.user.id,
-                'message_ids': message_ids,
-            }
-        )
+        await self.broadcast({
+            'type': 'read_receipt',
+            'user_id': self.user.id,
+            'message_ids': message_ids,
+        })
 
     async def handle_edit_message(self, data):
         """Handle message editing"""
@@ -175,13 +319,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         message = await self.edit_message(message_id, new_content)
         if message:
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'message_edited',
-                    'message': await self.message_to_dict(message),
-                }
-            )
+            await self.broadcast({
+                'type': 'message_edited',
+                'message': self.message_to_dict(message),
+            })
 
     async def handle_delete_message(self, data):
         """Handle message deletion"""
@@ -189,14 +330,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         success = await self.delete_message(message_id)
         if success:
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'message_deleted',
-                    'message_id': message_id,
-                    'user_id': self.user.id,
-                }
-            )
+            await self.broadcast({
+                'type': 'message_deleted',
+                'message_id': message_id,
+                'user_id': self.user.id,
+            })
 
     async def handle_reaction(self, data):
         """Handle message reactions"""
@@ -209,117 +347,87 @@ class ChatConsumer(AsyncWebsocketConsumer):
         else:
             await self.remove_reaction(message_id, emoji)
 
+        await self.broadcast({
+            'type': 'reaction',
+            'message_id': message_id,
+            'user_id': self.user.id,
+            'emoji': emoji,
+            'action': action,
+        })
+
+    async def broadcast(self, payload, skip_self=False):
+        """Encode a frame once and fan it out to the room group"""
         await self.channel_layer.group_send(
             self.room_group_name,
             {
-                'type': 'message_reaction',
-                'message_id': message_id,
-                'user_id': self.user.id,
-                'emoji': emoji,
-                'action': action,
+                'type': 'raw_send',
+                'payload': dump_json(payload),
+                'skip_user_id': self.user.id if skip_self else None,
             }
         )
 
-    # WebSocket message handlers (called by group_send)
-    async def chat_message(self, event):
-        """Send chat message to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message'],
-        }))
-
-    async def typing_indicator(self, event):
-        """Send typing indicator to WebSocket"""
-        # Don't send own typing indicator back
-        if event['user_id'] != self.user.id:
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'user_id': event['user_id'],
-                'username': event['username'],
-                'is_typing': event['is_typing'],
-            }))
-
-    async def read_receipt(self, event):
-        """Send read receipt to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'read_receipt',
-            'user_id': event['user_id'],
-            'message_ids': event['message_ids'],
-        }))
-
-    async def message_edited(self, event):
-        """Send edited message to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'message_edited',
-            'message': event['message'],
-        }))
-
-    async def message_deleted(self, event):
-        """Send message deletion notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'message_deleted',
-            'message_id': event['message_id'],
-            'user_id': event['user_id'],
-        }))
-
-    async def message_reaction(self, event):
-        """Send reaction update to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'reaction',
-            'message_id': event['message_id'],
-            'user_id': event['user_id'],
-            'emoji': event['emoji'],
-            'action': event['action'],
-        }))
-
-    async def user_join(self, event):
-        """Notify about user joining"""
-        if event['user_id'] != self.user.id:
-            await self.send(text_data=json.dumps({
-                'type': 'user_join',
-                'user_id': event['user_id'],
-                'username': event['username'],
-            }))
+    async def has_other_subscribers(self):
+        """Whether any socket besides this one is in the room group"""
+        now = time.monotonic()
+        if (self._others_seen_at is not None
+                and now - self._others_seen_at < self.SUBSCRIBER_CHECK_INTERVAL):
+            return True
+        count = await group_size(self.channel_layer, self.room_group_name)
+        # An unknown count means broadcast anyway
+        if count is None or count > 1:
+            self._others_seen_at = now
+            return True
+        return False
 
-    async def user_leave(self, event):
-        """Notify about user leaving"""
-        if event['user_id'] != self.user.id:
-            await self.send(text_data=json.dumps({
-                'type': 'user_leave',
-                'user_id': event['user_id'],
-                'username': event['username'],
-            }))
+    # WebSocket message handlers (called by group_send)
+    async def raw_send(self, event):
+        """Send a pre-encoded frame to WebSocket"""
+        if event['skip_user_id'] != self.user.id:
+            await self.send(text_data=event['payload'])
 
     # Database operations
+    # Single-statement queries use the async ORM directly; anything that runs
+    # several statements or a transaction stays in one database_sync_to_async
+    # call so it costs a single thread-pool hop
     @database_sync_to_async
     def check_conversation_membership(self):
         """Check if user is a member of the conversation"""
-        return UserConversation.objects.filter(
-            user=self.user,
-            conversation_id=self.conversation_id,
-            left_at__isnull=True
-        ).exists()
+        return cache.get_or_set(
+            membership_key(self.user.id, self.conversation_id),
+            lambda: UserConversation.objects.filter(
+                user=self.user,
+                conversation_id=self.conversation_id,
+                left_at__isnull=True
+            ).exists(),
+            MEMBERSHIP_CACHE_TIMEOUT
+        )
 
     @database_sync_to_async
     def create_message(self, content, reply_to_id=None):
         """Create a new message in the database"""
-        message = Message.objects.create(
-            conversation_id=self.conversation_id,
-            author=self.user,
-            content=content,
-            reply_to_id=reply_to_id,
-        )
-        # Update conversation's updated_at
-        Conversation.objects.filter(id=self.conversation_id).update(
-            updated_at=timezone.now()
-        )
+        with transaction.atomic():
+            message = Message.objects.create(
+                conversation_id=self.conversation_id,
+                author=self.user,
+                content=content,
+                reply_to_id=reply_to_id,
+            )
+            # Update conversation's updated_at
+            Conversation.objects.filter(id=self.conversation_id).update(
+                updated_at=Now()
+            )
+            # Create message statuses for all participants
+            self.create_message_statuses(message)
         return message
 
     @database_sync_to_async
     def edit_message(self, message_id, new_content):
         """Edit an existing message"""
         try:
-            message = Message.objects.get(
+            message = Message.objects.only(
+                'id', 'author_id', 'content', 'type', 'created_at',
+                'is_edited', 'edited_at', 'reply_to_id'
+            ).get(
                 id=message_id,
                 author=self.user,
                 conversation_id=self.conversation_id,
@@ -330,111 +438,142 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except Message.DoesNotExist:
             return None
 
-    @database_sync_to_async
-    def delete_message(self, message_id):
+    async def delete_message(self, message_id):
         """Soft delete a message"""
-        try:
-            message = Message.objects.get(
-                id=message_id,
-                author=self.user,
-                conversation_id=self.conversation_id
-            )
-            message.soft_delete()
-            return True
-        except Message.DoesNotExist:
-            return False
+        # A filtered UPDATE both checks ownership and deletes; nothing to fetch.
+        # Already-deleted messages don't match, so they aren't re-stamped or
+        # broadcast again
+        updated = await Message.objects.filter(
+            id=message_id,
+            author_id=self.user.id,
+            conversation_id=self.conversation_id,
+            is_deleted=False
+        ).asoft_delete(Now())
+        return updated > 0
 
-    @database_sync_to_async
     def create_message_statuses(self, message):
         """Create message status entries for all conversation participants"""
-        participants = UserConversation.objects.filter(
-            conversation_id=self.conversation_id,
-            left_at__isnull=True
-        ).exclude(user=self.user)
-
-        statuses = [
-            MessageStatus(
-                message=message,
-                user=uc.user,
-                status='sent'
+        # Single INSERT ... SELECT instead of fetching participants into Python
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {MessageStatus._meta.db_table} (message_id, user_id, status, sent_at)
+                SELECT %s, user_id, 'sent', NOW()
+                FROM {UserConversation._meta.db_table}
+                WHERE conversation_id = %s AND left_at IS NULL AND user_id <> %s
+                """,
+                [message.id, self.conversation_id, self.user.id]
             )
-            for uc in participants
-        ]
-        MessageStatus.objects.bulk_create(statuses)
 
     @database_sync_to_async
     def mark_messages_as_read(self, message_ids):
         """Mark multiple messages as read"""
-        MessageStatus.objects.filter(
-            message_id__in=message_ids,
-            user=self.user
-        ).update(
-            status='read',
-            read_at=timezone.now()
-        )
+        if not message_ids:
+            return
 
-        # Update last_read_at for user conversation
-        UserConversation.objects.filter(
-            user=self.user,
-            conversation_id=self.conversation_id
-        ).update(last_read_at=timezone.now())
+        with transaction.atomic():
+            MessageStatus.objects.mark_read_bulk(message_ids, self.user)
 
-    @database_sync_to_async
-    def add_reaction(self, message_id, emoji):
+            # Update last_read_at for user conversation
+            UserConversation.objects.filter(
+                user=self.user,
+                conversation_id=self.conversation_id
+            ).update(last_read_at=Now(), unread_count=0)
+
+    async def add_reaction(self, message_id, emoji):
         """Add a reaction to a message"""
-        from .models import Reaction
-        Reaction.objects.get_or_create(
-            message_id=message_id,
-            user=self.user,
-            emoji=emoji
+        # INSERT ... ON CONFLICT DO NOTHING against the unique
+        # (message, user, emoji) constraint: one round trip, race-safe
+        await Reaction.objects.abulk_create(
+            [Reaction(message_id=message_id, user_id=self.user.id, emoji=emoji)],
+            ignore_conflicts=True
         )
 
-    @database_sync_to_async
-    def remove_reaction(self, message_id, emoji):
+    async def remove_reaction(self, message_id, emoji):
         """Remove a reaction from a message"""
-        from .models import Reaction
-        Reaction.objects.filter(
+        await Reaction.objects.filter(
             message_id=message_id,
-            user=self.user,
+            user_id=self.user.id,
             emoji=emoji
-        ).delete()
+        ).adelete()
 
-    @database_sync_to_async
-    def set_typing_indicator(self):
+    # Typing state is short-lived, so it lives in the cache with a TTL
+    # instead of being written to the database on every keystroke
+    async def set_typing_indicator(self):
         """Set typing indicator for user"""
-        TypingIndicator.objects.update_or_create(
-            conversation_id=self.conversation_id,
-            user=self.user,
-            defaults={'started_at': timezone.now()}
+        await cache.aset(
+            typing_key(self.conversation_id, self.user.id),
+            1,
+            TYPING_TIMEOUT
         )
 
-    @database_sync_to_async
-    def clear_typing_indicator(self):
+    async def clear_typing_indicator(self):
         """Clear typing indicator for user"""
-        TypingIndicator.objects.filter(
+        await cache.adelete(typing_key(self.conversation_id, self.user.id))
+
+    @database_sync_to_async
+    def get_typing_users(self):
+        """Other active members currently typing, as ``user_id``/``username`` dicts"""
+        members = dict(UserConversation.objects.filter(
             conversation_id=self.conversation_id,
-            user=self.user
-        ).delete()
+            left_at__isnull=True
+        ).exclude(user_id=self.user.id).values_list('user_id', 'user__username'))
+        return [
+            {'user_id': user_id, 'username': members[user_id]}
+            for user_id in typing_user_ids(self.conversation_id, members)
+        ]
 
     @database_sync_to_async
     def update_online_status(self, online=True):
         """Update user's online status"""
-        status, created = OnlineStatus.objects.get_or_create(
-            user=self.user
-        )
-        if online:
-            status.go_online()
-            status.update_activity(conversation_id=self.conversation_id)
-        else:
-            status.go_offline()
+        table = OnlineStatus._meta.db_table
+        with connection.cursor() as cursor:
+            if online:
+                # One upsert instead of get_or_create followed by saves
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (
+                        user_id, is_online, last_activity_at, current_conversation_id,
+                        show_online_status, show_last_seen, connection_count
+                    )
+                    VALUES (%s, TRUE, NOW(), %s, %s, %s, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        is_online = TRUE,
+                        last_activity_at = EXCLUDED.last_activity_at,
+                        current_conversation_id = EXCLUDED.current_conversation_id,
+                        connection_count = {table}.connection_count + 1
+                    """,
+                    [
+                        self.user.id,
+                        self.conversation_id,
+                        OnlineStatus._meta.get_field('show_online_status').default,
+                        OnlineStatus._meta.get_field('show_last_seen').default,
+                    ]
+                )
+            else:
+                # Right-hand sides see the pre-update connection_count
+                cursor.execute(
+                    f"""
+                    UPDATE {table} SET
+                        connection_count = GREATEST(connection_count - 1, 0),
+                        is_online = connection_count > 1,
+                        last_seen_at = CASE
+                            WHEN connection_count <= 1 THEN NOW() ELSE last_seen_at
+                        END,
+                        last_activity_at = NOW()
+                    WHERE user_id = %s
+                    """,
+                    [self.user.id]
+                )
 
-    @database_sync_to_async
     def message_to_dict(self, message):
         """Convert message object to dictionary"""
+        # Messages only reach here after this connection's user created or
+        # edited them, so the author is self.user and no lookup is needed
         return {
             'id': message.id,
-            'author_id': message.author.id if message.author else None,
-            'author_username': message.author.username if message.author else 'System',
+            'author_id': message.author_id,
+            'author_username': self.user.username if message.author_id else 'System',
             'content': message.content,
             'type': message.type,
             'created_at': message.created_at.isoformat(),
@@ -467,7 +606,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-        await self.accept()
+        await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
@@ -484,7 +623,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     async def notification(self, event):
         """Send notification to WebSocket"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dump_json({
             'type': 'notification',
             'notification': event['notification'],
         }))
@@ -0,0 +1,43 @@
+import orjson
+from django.core.management.base import BaseCommand
+
+from chat.models import Message
+
+
+class Command(BaseCommand):
+    help = "Export messages as JSON Lines, streamed with a server-side cursor"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversation', type=int, help="Only export this conversation id")
+        parser.add_argument('--include-deleted', action='store_true', help="Include soft-deleted messages")
+        parser.add_argument('--output', help="Write to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        messages = Message.objects.select_related('author').order_by('conversation_id', 'created_at')
+        if options['conversation'] is not None:
+            messages = messages.filter(conversation_id=options['conversation'])
+        if not options['include_deleted']:
+            messages = messages.filter(is_deleted=False)
+
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        exported = 0
+        try:
+            # iterator() streams rows 2000 at a time instead of loading the whole table
+            for message in messages.iterator(chunk_size=2000):
+                out.write(orjson.dumps({
+                    'id': message.id,
+                    'conversation_id': message.conversation_id,
+                    'author': message.author.username if message.author else None,
+                    'type': message.type,
+                    'content': message.content,
+                    'created_at': message.created_at,
+                    'is_edited': message.is_edited,
+                    'is_deleted': message.is_deleted,
+                    'reply_to_id': message.reply_to_id,
+                }).decode() + '\n')
+                exported += 1
+        finally:
+            if options['output']:
+                out.close()
+
+        self.stderr.write(f"Exported {exported} messages")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from chat.models import TypingIndicator
+
+
+class Command(BaseCommand):
+    help = "Delete leftover TypingIndicator rows (nothing writes to the table any more)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, help="Only delete rows older than this many seconds")
+
+    def handle(self, *args, **options):
+        deleted, _ = TypingIndicator.objects.delete_expired(older_than_seconds=options['older_than'])
+        self.stderr.write(f"Deleted {deleted} typing indicators")
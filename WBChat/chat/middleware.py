@@ -0,0 +1,76 @@
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    """Resolve a user from a JWT access token (primary key lookup only)"""
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return AnonymousUser()
+
+    User = get_user_model()
+    try:
+        return User.objects.get(
+            **{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]},
+            is_active=True
+        )
+    except (KeyError, User.DoesNotExist):
+        return AnonymousUser()
+
+
+# Browsers can't set headers on a WebSocket, so they offer the token as a
+# second subprotocol: new WebSocket(url, ['bearer', token])
+AUTH_SUBPROTOCOL = 'bearer'
+
+
+class JWTAuthMiddleware:
+    """
+    Authenticates WebSocket connections with a JWT access token, sent either
+    as an ``Authorization: Bearer <token>`` header or, from browsers, as the
+    ``Sec-WebSocket-Protocol`` pair ``bearer, <token>``. Tokens never go in
+    the URL, where access logs would record them. The token is verified by
+    signature alone, so the session store is never read; connections without
+    a token use Channels' session auth.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.session_auth = AuthMiddlewareStack(inner)
+
+    async def __call__(self, scope, receive, send):
+        raw_token, subprotocol = self.get_raw_token(scope)
+        if raw_token is None:
+            return await self.session_auth(scope, receive, send)
+
+        scope = dict(
+            scope,
+            user=await get_user_from_token(raw_token),
+            # Consumers echo this on accept(); the token itself is never echoed
+            auth_subprotocol=subprotocol
+        )
+        return await self.inner(scope, receive, send)
+
+    @staticmethod
+    def get_raw_token(scope):
+        """Return ``(token, subprotocol to accept with)``, or ``(None, None)``"""
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                try:
+                    parts = value.decode().split()
+                except UnicodeDecodeError:
+                    # Not a token we could have issued; treat as absent
+                    continue
+                if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                    return parts[1], None
+
+        subprotocols = scope.get('subprotocols') or []
+        if len(subprotocols) >= 2 and subprotocols[0] == AUTH_SUBPROTOCOL:
+            return subprotocols[1], AUTH_SUBPROTOCOL
+        return None, None
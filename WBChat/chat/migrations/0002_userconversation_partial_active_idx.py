@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-14 15:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userconversation",
+            index=models.Index(
+                condition=models.Q(("left_at__isnull", True)),
+                fields=["conversation", "user"],
+                name="chat_userconv_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-14 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Seed the new counters with the values get_unread_count used to compute"""
+    Message = apps.get_model("chat", "Message")
+    UserConversation = apps.get_model("chat", "UserConversation")
+
+    def count_unread(*filters):
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(conversation=OuterRef("conversation"), *filters)
+                .filter(Q(author__isnull=True) | ~Q(author=OuterRef("user")))
+                .order_by()
+                .values("conversation")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+
+    UserConversation.objects.filter(last_read_at__isnull=True).update(
+        unread_count=count_unread()
+    )
+    UserConversation.objects.filter(last_read_at__isnull=False).update(
+        unread_count=count_unread(Q(created_at__gt=OuterRef("last_read_at")))
+    )
+    UserConversation.objects.update(
+        last_message_at=Subquery(
+            Message.objects.filter(conversation=OuterRef("conversation"))
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_userconversation_partial_active_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userconversation",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userconversation",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
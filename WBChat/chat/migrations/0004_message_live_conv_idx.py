@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-14 15:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_userconversation_unread_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["conversation", "-created_at"],
+                name="chat_msg_live_conv_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-14 15:44
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def backfill_preview(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    Message.objects.update(preview=Substr("content", 1, 60))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_message_live_conv_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="preview",
+            field=models.CharField(blank=True, editable=False, max_length=60),
+        ),
+        migrations.RunPython(backfill_preview, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,61 @@
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models import Case, F, OuterRef, Prefetch, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Now
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
+from datetime import timedelta
 from django.core.validators import FileExtensionValidator
 
+from .caching import PRESENCE_TIMEOUT, presence_key
+
+
+def participants_prefetch(lookup='participants'):
+    """
+    Prefetch participant usernames along ``lookup`` into the attribute
+    ``Conversation.__str__`` reads, so it doesn't query per conversation.
+    """
+    return Prefetch(
+        lookup,
+        queryset=get_user_model().objects.only('id', 'username'),
+        to_attr='_prefetched_participants'
+    )
+
+
+class ConversationQuerySet(models.QuerySet):
+    def with_unread_for(self, user):
+        """
+        Annotate each conversation with ``user``'s ``unread_count`` in a
+        single query, read from the denormalized ``UserConversation`` counter.
+        """
+        unread = UserConversation.objects.filter(
+            user=user,
+            conversation=OuterRef('pk')
+        ).values('unread_count')[:1]
+
+        return self.annotate(unread_count=Coalesce(Subquery(unread), 0))
+
+    def with_participants(self):
+        """
+        Prefetch participant usernames in one IN query so ``__str__`` on
+        direct conversations doesn't query once per row.
+        """
+        return self.prefetch_related(participants_prefetch())
+
+    def for_sidebar(self, user):
+        """
+        ``user``'s active conversations with just the columns a conversation
+        list renders, plus participant names and unread counts.
+        """
+        return self.filter(
+            userconversation__user=user,
+            userconversation__left_at__isnull=True
+        ).only(
+            'id', 'type', 'name', 'avatar', 'updated_at'
+        ).with_participants().with_unread_for(user)
+
 
 class Conversation(models.Model):
     """
@@ -41,6 +94,8 @@ class Conversation(models.Model):
     is_archived = models.BooleanField(default=False)
     allow_guests = models.BooleanField(default=False)
 
+    objects = ConversationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']
         indexes = [
@@ -51,23 +106,24 @@ class Conversation(models.Model):
     def __str__(self):
         if self.type == 'direct':
             # For direct messages, show participants
-            users = self.participants.all()[:2]
+            users = getattr(self, '_prefetched_participants', None)
+            if users is None:
+                users = self.participants.all()
+            users = users[:2]
             return f"DM: {' & '.join([u.username for u in users])}"
         return self.name or f"{self.get_type_display()} #{self.id}"
 
     def get_unread_count(self, user):
-        """Get unread message count for a user"""
-        last_read = UserConversation.objects.filter(
+        """
+        Get unread message count for a user.
+        When listing conversations use ``Conversation.objects.with_unread_for``
+        instead, which reads every row's counter in one query.
+        """
+        unread_count = UserConversation.objects.filter(
             conversation=self,
             user=user
-        ).first()
-
-        if not last_read or not last_read.last_read_at:
-            return self.messages.count()
-
-        return self.messages.filter(
-            created_at__gt=last_read.last_read_at
-        ).exclude(author=user).count()
+        ).values_list('unread_count', flat=True).first()
+        return unread_count or 0
 
 
 class UserConversation(models.Model):
@@ -93,6 +149,9 @@ class UserConversation(models.Model):
     # Status
     is_pinned = models.BooleanField(default=False)
     last_read_at = models.DateTimeField(null=True, blank=True)
+    # Denormalized by the Message post_save signal; reset when read
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
     joined_at = models.DateTimeField(auto_now_add=True)
     left_at = models.DateTimeField(null=True, blank=True)
 
@@ -106,6 +165,13 @@ class UserConversation(models.Model):
         indexes = [
             models.Index(fields=['user', '-is_pinned']),
             models.Index(fields=['conversation', 'role']),
+            # Active participants only: serves the membership check and the
+            # message-status INSERT ... SELECT in the chat consumer
+            models.Index(
+                fields=['conversation', 'user'],
+                condition=models.Q(left_at__isnull=True),
+                name='chat_userconv_active_idx',
+            ),
         ]
 
     def __str__(self):
@@ -114,7 +180,33 @@ class UserConversation(models.Model):
     def mark_as_read(self):
         """Mark conversation as read for this user"""
         self.last_read_at = timezone.now()
-        self.save(update_fields=['last_read_at'])
+        self.unread_count = 0
+        self.save(update_fields=['last_read_at', 'unread_count'])
+
+
+class MessageQuerySet(models.QuerySet):
+    def soft_delete(self, deleted_at=None):
+        """
+        Soft delete every message in the queryset with one UPDATE.
+        ``deleted_at`` may be an expression such as ``Now()`` to stamp rows
+        with the database clock.
+        """
+        if deleted_at is None:
+            deleted_at = timezone.now()
+        return self.update(is_deleted=True, deleted_at=deleted_at)
+
+    async def asoft_delete(self, deleted_at=None):
+        """Async ``soft_delete``, for the consumers"""
+        return await sync_to_async(self.soft_delete)(deleted_at)
+
+    def edit_bulk(self, new_content, edited_at=None):
+        """Replace the content of every message in the queryset with one UPDATE"""
+        return self.update(
+            content=new_content,
+            preview=new_content[:Message.PREVIEW_LENGTH],
+            is_edited=True,
+            edited_at=edited_at or timezone.now()
+        )
 
 
 class Message(models.Model):
@@ -129,6 +221,7 @@ class Message(models.Model):
         ('file', 'File'),
         ('system', 'System'),
     ]
+    PREVIEW_LENGTH = 60
 
     conversation = models.ForeignKey(
         Conversation,
@@ -145,6 +238,8 @@ class Message(models.Model):
     # Content
     type = models.CharField(max_length=10, choices=MESSAGE_TYPES, default='text')
     content = models.TextField(help_text="Message text content")
+    # First characters of content, so __str__ and list views can defer the TEXT column
+    preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, editable=False)
 
     # Reply/Forward
     reply_to = models.ForeignKey(
@@ -177,31 +272,70 @@ class Message(models.Model):
     scheduled_for = models.DateTimeField(null=True, blank=True)
     is_sent = models.BooleanField(default=True)
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']
         indexes = [
             models.Index(fields=['conversation', '-created_at']),
             models.Index(fields=['author', '-created_at']),
             models.Index(fields=['is_deleted', '-created_at']),
+            # History reads skip soft-deleted rows, so only live ones are indexed
+            models.Index(
+                fields=['conversation', '-created_at'],
+                condition=models.Q(is_deleted=False),
+                name='chat_msg_live_conv_idx',
+            ),
         ]
 
     def __str__(self):
         author_name = self.author.username if self.author else "System"
-        preview = self.content[:50] + "..." if len(self.content) > 50 else self.content
+        preview = self.preview[:50] + "..." if len(self.preview) > 50 else self.preview
         return f"{author_name}: {preview}"
 
+    def save(self, *args, **kwargs):
+        if 'content' not in self.get_deferred_fields():
+            self.preview = (self.content or '')[:self.PREVIEW_LENGTH]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'preview'}
+        super().save(*args, **kwargs)
+
     def soft_delete(self):
         """Soft delete the message"""
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        Message.objects.filter(pk=self.pk).soft_delete(self.deleted_at)
 
     def edit(self, new_content):
         """Edit the message content"""
         self.content = new_content
         self.is_edited = True
         self.edited_at = timezone.now()
-        self.save(update_fields=['content', 'is_edited', 'edited_at'])
+        Message.objects.filter(pk=self.pk).edit_bulk(new_content, self.edited_at)
+
+
+class MessageStatusQuerySet(models.QuerySet):
+    # Timestamps come from the database clock, the same one the consumer's
+    # Now() writes to UserConversation.last_read_at, so app-server clock skew
+    # can't order read_at after last_read_at
+
+    def mark_delivered_bulk(self, message_ids, user):
+        """Mark ``user``'s sent statuses for ``message_ids`` delivered in one UPDATE"""
+        return self.filter(
+            user=user,
+            message_id__in=message_ids,
+            status='sent'
+        ).update(status='delivered', delivered_at=Now())
+
+    def mark_read_bulk(self, message_ids, user):
+        """Mark ``user``'s statuses for ``message_ids`` read in one UPDATE"""
+        return self.filter(
+            user=user,
+            message_id__in=message_ids
+        ).exclude(
+            status='read'
+        ).update(status='read', read_at=Now())
 
 
 class MessageStatus(models.Model):
@@ -231,6 +365,8 @@ class MessageStatus(models.Model):
     delivered_at = models.DateTimeField(null=True, blank=True)
     read_at = models.DateTimeField(null=True, blank=True)
 
+    objects = MessageStatusQuerySet.as_manager()
+
     class Meta:
         unique_together = ['message', 'user']
         verbose_name_plural = 'Message statuses'
@@ -339,9 +475,19 @@ class Reaction(models.Model):
         return f"{self.user.username} reacted {self.emoji} to message {self.message.id}"
 
 
+class TypingIndicatorQuerySet(models.QuerySet):
+    def delete_expired(self, older_than_seconds=30):
+        """Delete stale indicators in one DELETE without loading them"""
+        return self.filter(
+            started_at__lt=timezone.now() - timedelta(seconds=older_than_seconds)
+        ).delete()
+
+
 class TypingIndicator(models.Model):
     """
     Tracks users currently typing in a conversation.
+    Dormant: the consumers keep typing state in the cache with a TTL
+    (see ``chat.caching.typing_key``) and no longer write to this table.
     """
     conversation = models.ForeignKey(
         Conversation,
@@ -355,6 +501,8 @@ class TypingIndicator(models.Model):
     )
     started_at = models.DateTimeField(auto_now=True)
 
+    objects = TypingIndicatorQuerySet.as_manager()
+
     class Meta:
         unique_together = ['conversation', 'user']
         indexes = [
@@ -426,22 +574,41 @@ class OnlineStatus(models.Model):
         return f"{self.user.username}: {status}"
 
     def go_online(self):
-        """Mark user as online"""
-        self.is_online = True
-        self.connection_count += 1
-        self.save(update_fields=['is_online', 'connection_count', 'last_activity_at'])
+        """Mark user as online (one UPDATE; the instance is not refreshed)"""
+        # Incremented in SQL so concurrent connections can't lose an update
+        OnlineStatus.objects.filter(pk=self.pk).update(
+            is_online=True,
+            connection_count=F('connection_count') + 1,
+            last_activity_at=timezone.now()
+        )
 
     def go_offline(self):
-        """Mark user as offline"""
-        self.connection_count = max(0, self.connection_count - 1)
-        if self.connection_count == 0:
-            self.is_online = False
-            self.last_seen_at = timezone.now()
-        self.save(update_fields=['is_online', 'connection_count', 'last_seen_at', 'last_activity_at'])
+        """Mark user as offline (one UPDATE; the instance is not refreshed)"""
+        # Every right-hand side sees the pre-update connection_count
+        now = timezone.now()
+        OnlineStatus.objects.filter(pk=self.pk).update(
+            connection_count=Greatest(F('connection_count') - 1, 0),
+            is_online=Case(
+                When(connection_count__lte=1, then=Value(False)),
+                default=Value(True)
+            ),
+            last_seen_at=Case(
+                When(connection_count__lte=1, then=Value(now)),
+                default=F('last_seen_at')
+            ),
+            last_activity_at=now
+        )
 
     def update_activity(self, conversation=None):
-        """Update last activity timestamp"""
+        """
+        Update last activity timestamp. Kept in the cache rather than saved;
+        ``chat.tasks.flush_presence`` writes it back periodically.
+        """
         self.last_activity_at = timezone.now()
         if conversation:
             self.current_conversation = conversation
-        self.save(update_fields=['last_activity_at', 'current_conversation'])
+        cache.set(
+            presence_key(self.user_id),
+            (self.last_activity_at, self.current_conversation_id),
+            PRESENCE_TIMEOUT
+        )
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.db.models import Case, F, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import membership_key
+from .models import Message, UserConversation
+
+
+@receiver(post_save, sender=UserConversation)
+@receiver(post_delete, sender=UserConversation)
+def invalidate_membership_cache(sender, instance, **kwargs):
+    """Drop the cached membership check when a participant row changes"""
+    cache.delete(membership_key(instance.user_id, instance.conversation_id))
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_counters(sender, instance, created, **kwargs):
+    """Bump unread counters and last_message_at for active participants"""
+    if not created:
+        return
+    # One UPDATE for every participant; the author's own counter is unchanged
+    UserConversation.objects.filter(
+        conversation_id=instance.conversation_id,
+        left_at__isnull=True
+    ).update(
+        unread_count=Case(
+            When(user_id=instance.author_id, then=F('unread_count')),
+            default=F('unread_count') + 1
+        ),
+        last_message_at=instance.created_at
+    )
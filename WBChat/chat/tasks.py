@@ -0,0 +1,41 @@
+from celery import shared_task
+from django.core.cache import cache
+from django.db import connection
+
+from .caching import presence_key
+from .models import OnlineStatus
+
+
+@shared_task
+def flush_presence():
+    """Write cached last-activity entries of online users back to OnlineStatus"""
+    user_ids = OnlineStatus.objects.filter(is_online=True).values_list('user_id', flat=True)
+    keys = {presence_key(user_id): user_id for user_id in user_ids}
+    activity = cache.get_many(keys)
+
+    rows = [
+        (keys[key], last_activity_at, conversation_id)
+        for key, (last_activity_at, conversation_id) in activity.items()
+    ]
+    table = OnlineStatus._meta.db_table
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            # Only move rows forward: a reconnect or disconnect may already
+            # have written something newer than an entry still in the cache.
+            # Entries aren't deleted here (that would race with new writes);
+            # flushing one twice matches no rows the second time.
+            cursor.execute(
+                f"""
+                UPDATE {table} AS s SET
+                    last_activity_at = v.last_activity_at,
+                    current_conversation_id = v.conversation_id
+                FROM (VALUES {', '.join(['(%s::bigint, %s::timestamptz, %s::bigint)'] * len(batch))})
+                    AS v(user_id, last_activity_at, conversation_id)
+                WHERE s.user_id = v.user_id AND s.last_activity_at < v.last_activity_at
+                """,
+                [value for row in batch for value in row]
+            )
+            updated += cursor.rowcount
+    return updated
@@ -1,3 +1,59 @@
-from django.test import TestCase
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from . import routing
+from .middleware import JWTAuthMiddleware
+
+application = JWTAuthMiddleware(URLRouter(routing.websocket_urlpatterns))
+
+
+class JWTAuthMiddlewareTests(TransactionTestCase):
+    """WebSocket authentication through the bearer subprotocol, the header and the session"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('alice', password='secret')
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def connect(self, **kwargs):
+        communicator = WebsocketCommunicator(application, '/ws/notifications/', **kwargs)
+        connected, subprotocol = await communicator.connect()
+        if connected:
+            await communicator.disconnect()
+        return connected, subprotocol
+
+    async def test_bearer_subprotocol_accepted(self):
+        connected, subprotocol = await self.connect(subprotocols=['bearer', self.token])
+        self.assertTrue(connected)
+        # Only the marker is echoed back, never the token
+        self.assertEqual(subprotocol, 'bearer')
+
+    async def test_authorization_header_accepted(self):
+        connected, subprotocol = await self.connect(
+            headers=[(b'authorization', f'Bearer {self.token}'.encode())]
+        )
+        self.assertTrue(connected)
+        self.assertIsNone(subprotocol)
+
+    async def test_invalid_token_rejected(self):
+        connected, _ = await self.connect(subprotocols=['bearer', 'not-a-jwt'])
+        self.assertFalse(connected)
+        connected, _ = await self.connect(headers=[(b'authorization', b'Bearer not-a-jwt')])
+        self.assertFalse(connected)
+
+    async def test_non_utf8_authorization_header_ignored(self):
+        connected, _ = await self.connect(headers=[(b'authorization', b'Bearer \xff\xfe')])
+        self.assertFalse(connected)
+
+    async def test_no_token_falls_back_to_session(self):
+        await self.async_client.aforce_login(self.user)
+        cookie = f"sessionid={self.async_client.cookies['sessionid'].value}".encode()
+        connected, subprotocol = await self.connect(headers=[(b'cookie', cookie)])
+        self.assertTrue(connected)
+        self.assertIsNone(subprotocol)
+        connected, _ = await self.connect()
+        self.assertFalse(connected)
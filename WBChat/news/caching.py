@@ -0,0 +1,22 @@
+"""
+Cache keys and timeouts for the news list.
+"""
+import time
+
+from django.core.cache import cache
+
+# Upper bound on how stale a cached news page can get (seconds)
+NEWS_LIST_CACHE_TIMEOUT = 60
+
+NEWS_LIST_VERSION_KEY = 'news_list:version'
+
+
+def news_list_prefix():
+    """Key prefix for the current generation of cached news pages."""
+    version = cache.get_or_set(NEWS_LIST_VERSION_KEY, time.time_ns, None)
+    return f'news_list:{version}'
+
+
+def invalidate_news_list():
+    """Start a new generation; old page keys are never read again and expire."""
+    cache.delete(NEWS_LIST_VERSION_KEY)
@@ -1,22 +1,41 @@
+import csv
+import io
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from .caching import NEWS_LIST_CACHE_TIMEOUT, invalidate_news_list, news_list_prefix
 from .models import News
+from accounts.decorators import moderator_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
 @login_required(login_url='login')
 def news_list(request):
-    news = News.objects.order_by('-created_at')
-    return render(request, 'news/news_list.html', {'news': news})
+    # Только поля, которые выводит шаблон списка, автор - одним JOIN'ом
+    news = News.objects.select_related('author').only(
+        'id', 'title', 'content', 'created_at', 'image', 'author__username'
+    ).order_by('-created_at')
+    paginator = Paginator(news, 25)
+
+    # Количество и строки страницы берутся из кэша, сигналы сбрасывают его при изменениях
+    prefix = news_list_prefix()
+    paginator.count = cache.get_or_set(f'{prefix}:count', news.count, NEWS_LIST_CACHE_TIMEOUT)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = cache.get_or_set(
+        f'{prefix}:page:{page_obj.number}',
+        lambda: list(page_obj.object_list),
+        NEWS_LIST_CACHE_TIMEOUT
+    )
+    return render(request, 'news/news_list.html', {'news': page_obj, 'page_obj': page_obj})
 @login_required(login_url='login')
 def news_detail(request, pk):
-    news_item = get_object_or_404(News, pk=pk)
+    # Автор подтягивается JOIN'ом, шаблон выводит его имя
+    news_item = get_object_or_404(News.objects.select_related('author'), pk=pk)
     return render(request, 'news/news_detail.html', {'news_item': news_item})
-@login_required(login_url='login')
+@moderator_required
 def edit_news(request, pk):
     news_item = get_object_or_404(News, pk=pk)
 
-    if not request.user.is_authenticated or not request.user.isModerator:
-        return HttpResponseForbidden("У вас нет прав.")
-
     if request.method == 'POST':
         news_item.title = request.POST.get('title')
         news_item.content = request.POST.get('content')
@@ -28,20 +47,14 @@ def edit_news(request, pk):
         return redirect('news_detail', pk=news_item.pk)
 
     return render(request, 'news/edit_news.html', {'news_item': news_item})
-@login_required(login_url='login')
+@moderator_required
 def delete_news(request, pk):
     news_item = get_object_or_404(News, pk=pk)
 
-    if not request.user.is_authenticated or not request.user.isModerator:
-        return HttpResponseForbidden("У вас нет прав.")
-
     news_item.delete()
     return redirect('news_list')
-@login_required(login_url='login')
+@moderator_required
 def create_news(request):
-    if not request.user.is_authenticated or not request.user.isModerator:
-        return HttpResponseForbidden("У вас нет прав.")
-
     if request.method == "POST":
         title = request.POST.get("title")
         content = request.POST.get("content")
@@ -57,3 +70,38 @@ def create_news(request):
         return redirect('news_list')
 
     return render(request, "news/create_news.html")
+@moderator_required
+def import_news(request):
+    if request.method == "POST":
+        csv_file = request.FILES.get("csv_file")
+        if not csv_file:
+            return render(request, "news/import_news.html", {"error": "Выберите CSV-файл"})
+
+        # Первая строка - заголовки, нужны колонки title и content
+        reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding="utf-8-sig"))
+        max_title = News._meta.get_field("title").max_length
+        items = []
+        try:
+            if not {"title", "content"} <= set(reader.fieldnames or []):
+                raise ValueError("Нужны колонки title и content")
+            for row in reader:
+                title, content = (row["title"] or "").strip(), (row["content"] or "").strip()
+                if not title or not content:
+                    raise ValueError(f"Строка {reader.line_num}: пустой заголовок или текст")
+                if len(title) > max_title:
+                    raise ValueError(f"Строка {reader.line_num}: заголовок длиннее {max_title} символов")
+                items.append(News(title=title, content=content, author=request.user))
+        except (UnicodeDecodeError, csv.Error):
+            return render(request, "news/import_news.html", {"error": "Файл должен быть CSV в кодировке UTF-8"})
+        except ValueError as e:
+            return render(request, "news/import_news.html", {"error": str(e)})
+
+        # Всё или ничего, вставка пачками по 500 строк за запрос
+        with transaction.atomic():
+            News.objects.bulk_create(items, batch_size=500)
+        # bulk_create не отправляет post_save, кэш списка сбрасываем вручную
+        invalidate_news_list()
+
+        return redirect('news_list')
+
+    return render(request, "news/import_news.html")